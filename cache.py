@@ -0,0 +1,90 @@
+"""
+本地文件缓存模块
+将API的JSON响应缓存到磁盘，按TTL过期，避免重复下载变化缓慢的数据
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import orjson
+
+
+class FileCache:
+    """基于文件的JSON缓存，每个key对应 <cache_dir>/<key>.json"""
+
+    def __init__(self, cache_dir: str = ".cache"):
+        """
+        初始化文件缓存
+
+        Args:
+            cache_dir: 缓存目录路径
+        """
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def make_key(url: str, params: Optional[Dict] = None) -> str:
+        """
+        根据请求地址和参数生成缓存key
+
+        Args:
+            url: 请求地址
+            params: 请求参数
+
+        Returns:
+            MD5十六进制字符串
+        """
+        raw = json.dumps((url, sorted((params or {}).items())), default=str)
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str, ttl: float) -> Optional[Any]:
+        """
+        读取缓存
+
+        Args:
+            key: 缓存key
+            ttl: 有效期（秒）
+
+        Returns:
+            缓存数据，不存在或已过期时返回None
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = orjson.loads(f.read())
+        except (OSError, ValueError):
+            return None
+
+        # 截断或非本模块写入的文件可能解析成列表/标量，按未命中处理
+        if not isinstance(entry, dict):
+            return None
+        if time.time() - entry.get('ts', 0) > ttl:
+            return None
+        return entry.get('data')
+
+    def set(self, key: str, value: Any):
+        """
+        写入缓存（先写临时文件再替换，避免读到半写文件）
+
+        Args:
+            key: 缓存key
+            value: 可JSON序列化的数据
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        # 临时文件名带进程/线程标识，多线程同时写同一个key时互不干扰
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            payload = orjson.dumps({'ts': time.time(), 'data': value})
+            with open(tmp_path, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError):
+            # 缓存写入失败（含orjson无法序列化的值）不影响主流程
+            pass
@@ -9,15 +9,42 @@
 3. 生成包含完整ABI解码参数的JSON文件
 
 依赖:
-- eth-abi
-- eth-utils
+- eth-abi (>=5.0)
+- ijson
+- orjson
+- tqdm
 """
 
 import json
 import os
+import shutil
+import time
+import multiprocessing
 from datetime import datetime
-from eth_abi import decode_abi
-from eth_utils import decode_hex
+from decimal import Decimal
+import ijson
+import orjson
+from tqdm import tqdm
+from eth_abi.decoding import ContextFramesBytesIO
+from eth_abi.registry import registry
+
+
+# Polymarket CTF Exchange 订单结构体字段（takerOrder 与 makerOrders 共用）
+ORDER_COMPONENTS = (
+    {'name': 'salt', 'type': 'uint256', 'description': '随机盐值'},
+    {'name': 'maker', 'type': 'address', 'description': 'maker地址'},
+    {'name': 'signer', 'type': 'address', 'description': '签名者地址'},
+    {'name': 'taker', 'type': 'address', 'description': 'taker地址'},
+    {'name': 'tokenId', 'type': 'uint256', 'description': '代币ID'},
+    {'name': 'makerAmount', 'type': 'uint256', 'description': 'maker数量'},
+    {'name': 'takerAmount', 'type': 'uint256', 'description': 'taker数量'},
+    {'name': 'expiration', 'type': 'uint256', 'description': '过期时间'},
+    {'name': 'nonce', 'type': 'uint256', 'description': 'nonce值'},
+    {'name': 'feeRateBps', 'type': 'uint256', 'description': '手续费率'},
+    {'name': 'side', 'type': 'uint8', 'description': '买卖方向'},
+    {'name': 'signatureType', 'type': 'uint8', 'description': '签名类型'},
+    {'name': 'signature', 'type': 'bytes', 'description': '签名数据'}
+)
 
 
 class CompletePolymarketABIDecoder:
@@ -35,41 +62,13 @@ class CompletePolymarketABIDecoder:
                         'name': 'takerOrder',
                         'type': 'tuple',
                         'description': 'taker订单结构体',
-                        'components': [
-                            {'name': 'salt', 'type': 'uint256', 'description': '随机盐值'},
-                            {'name': 'maker', 'type': 'address', 'description': 'maker地址'},
-                            {'name': 'signer', 'type': 'address', 'description': '签名者地址'},
-                            {'name': 'taker', 'type': 'address', 'description': 'taker地址'},
-                            {'name': 'tokenId', 'type': 'uint256', 'description': '代币ID'},
-                            {'name': 'makerAmount', 'type': 'uint256', 'description': 'maker数量'},
-                            {'name': 'takerAmount', 'type': 'uint256', 'description': 'taker数量'},
-                            {'name': 'expiration', 'type': 'uint256', 'description': '过期时间'},
-                            {'name': 'nonce', 'type': 'uint256', 'description': 'nonce值'},
-                            {'name': 'feeRateBps', 'type': 'uint256', 'description': '手续费率'},
-                            {'name': 'side', 'type': 'uint8', 'description': '买卖方向'},
-                            {'name': 'signatureType', 'type': 'uint8', 'description': '签名类型'},
-                            {'name': 'signature', 'type': 'bytes', 'description': '签名数据'}
-                        ]
+                        'components': ORDER_COMPONENTS
                     },
                     {
                         'name': 'makerOrders',
                         'type': 'tuple[]',
                         'description': 'maker订单数组',
-                        'components': [
-                            {'name': 'salt', 'type': 'uint256', 'description': '随机盐值'},
-                            {'name': 'maker', 'type': 'address', 'description': 'maker地址'},
-                            {'name': 'signer', 'type': 'address', 'description': '签名者地址'},
-                            {'name': 'taker', 'type': 'address', 'description': 'taker地址'},
-                            {'name': 'tokenId', 'type': 'uint256', 'description': '代币ID'},
-                            {'name': 'makerAmount', 'type': 'uint256', 'description': 'maker数量'},
-                            {'name': 'takerAmount', 'type': 'uint256', 'description': 'taker数量'},
-                            {'name': 'expiration', 'type': 'uint256', 'description': '过期时间'},
-                            {'name': 'nonce', 'type': 'uint256', 'description': 'nonce值'},
-                            {'name': 'feeRateBps', 'type': 'uint256', 'description': '手续费率'},
-                            {'name': 'side', 'type': 'uint8', 'description': '买卖方向'},
-                            {'name': 'signatureType', 'type': 'uint8', 'description': '签名类型'},
-                            {'name': 'signature', 'type': 'bytes', 'description': '签名数据'}
-                        ]
+                        'components': ORDER_COMPONENTS
                     },
                     {'name': 'takerFillAmount', 'type': 'uint256', 'description': 'taker成交数量'},
                     {'name': 'takerReceiveAmount', 'type': 'uint256', 'description': 'taker接收数量'},
@@ -185,6 +184,125 @@ class CompletePolymarketABIDecoder:
                 ]
             }
         }
+        
+        # 函数名 -> 描述，用于统计输出
+        self.desc_by_name = {info['name']: info['description'] for info in self.function_abis.values()}
+        
+        # 类型字符串只依赖静态ABI，初始化时一次性构建
+        self.type_strings = {
+            sig: self._build_type_strings(func_abi)
+            for sig, func_abi in self.function_abis.items()
+        }
+        
+        # 预先构建每个函数签名的元组解码器，解码时不再解析类型字符串
+        self.decoders = {
+            sig: registry.get_tuple_decoder(*types)
+            for sig, types in self.type_strings.items()
+        }
+        
+        # 按ABI为每个函数签名生成专用的参数列表构建函数，解码时不再逐个参数判断类型
+        self.result_builders = {
+            sig: self._build_result_builder(func_abi)
+            for sig, func_abi in self.function_abis.items()
+        }
+        
+        # 相同calldata的解码结果缓存（如重复的setApprovalForAll），按插入顺序淘汰
+        self.decode_cache = {}
+    
+    @staticmethod
+    def _build_type_strings(func_abi):
+        """构建函数参数的ABI类型字符串"""
+        types = []
+        for inp in func_abi['inputs']:
+            if inp['type'] == 'tuple':
+                components = inp['components']
+                component_types = [comp['type'] for comp in components]
+                types.append(f"({','.join(component_types)})")
+            elif inp['type'].endswith('[]'):
+                base_type = inp['type'][:-2]
+                if base_type == 'tuple':
+                    components = inp['components']
+                    component_types = [comp['type'] for comp in components]
+                    types.append(f"({','.join(component_types)})[]")
+                else:
+                    types.append(inp['type'])
+            else:
+                types.append(inp['type'])
+        return tuple(types)
+    
+    @staticmethod
+    def _format_component(comp_type):
+        """结构体字段的格式化函数（bytes字段输出十六进制）"""
+        if comp_type == 'bytes':
+            return lambda value: value.hex() if value else str(value)
+        return str
+    
+    @classmethod
+    def _build_result_builder(cls, func_abi):
+        """根据函数ABI生成参数列表构建函数"""
+        emitters = []
+        for inp in func_abi['inputs']:
+            name = inp['name']
+            if inp['type'] in ('tuple', 'tuple[]'):
+                fields = [
+                    (comp['name'], comp['type'], comp.get('description', ''), cls._format_component(comp['type']))
+                    for comp in inp['components']
+                ]
+                if inp['type'] == 'tuple':
+                    emitters.append(cls._struct_emitter(name, fields))
+                else:
+                    emitters.append(cls._struct_array_emitter(name, fields))
+            elif inp['type'].endswith('[]'):
+                emitters.append(cls._array_emitter(name, inp['type'][:-2], inp.get('description', '')))
+            else:
+                emitters.append(cls._scalar_emitter(name, inp['type'], inp.get('description', '')))
+        
+        def build(decoded):
+            result = []
+            for emit, value in zip(emitters, decoded):
+                emit(result, value)
+            return result
+        
+        return build
+    
+    @staticmethod
+    def _struct_emitter(name, fields):
+        """结构体参数：展开为 name.field"""
+        fields = [(f'{name}.{comp_name}', comp_type, desc, fmt) for comp_name, comp_type, desc, fmt in fields]
+        
+        def emit(result, struct_data):
+            for (full_name, comp_type, desc, fmt), value in zip(fields, struct_data):
+                result.append({'name': full_name, 'type': comp_type, 'description': desc, 'data': fmt(value)})
+        
+        return emit
+    
+    @staticmethod
+    def _struct_array_emitter(name, fields):
+        """结构体数组参数：展开为 name[j].field"""
+        def emit(result, array_data):
+            for j, struct_data in enumerate(array_data):
+                prefix = f'{name}[{j}].'
+                for (comp_name, comp_type, desc, fmt), value in zip(fields, struct_data):
+                    result.append({'name': prefix + comp_name, 'type': comp_type, 'description': desc, 'data': fmt(value)})
+        
+        return emit
+    
+    @staticmethod
+    def _array_emitter(name, base_type, desc):
+        """基础类型数组参数：展开为 name[j]"""
+        def emit(result, array_data):
+            for j, value in enumerate(array_data):
+                result.append({'name': f'{name}[{j}]', 'type': base_type, 'description': desc, 'data': str(value)})
+        
+        return emit
+    
+    @staticmethod
+    def _scalar_emitter(name, param_type, desc):
+        """基础类型参数"""
+        def emit(result, value):
+            result.append({'name': name, 'type': param_type, 'description': desc, 'data': str(value)})
+        
+        return emit
     
     def decode_function_input(self, input_hex):
         """解码函数输入数据"""
@@ -196,80 +314,79 @@ class CompletePolymarketABIDecoder:
         if method_sig not in self.function_abis:
             return None
             
-        func_abi = self.function_abis[method_sig]
+        return self.decode_many(method_sig, [input_hex])[0]
+    
+    def decode_many(self, method_sig, input_hexes):
+        """批量解码同一函数签名的多条calldata，解码器和构建函数只查找一次"""
+        decode = self.decoders[method_sig]
+        build = self.result_builders[method_sig]
+        cache = self.decode_cache
         
-        try:
-            input_bytes = decode_hex(input_hex)
-            data_bytes = input_bytes[4:]  # 移除方法签名
-            
-            # 构建类型字符串
-            types = []
-            for inp in func_abi['inputs']:
-                if inp['type'] == 'tuple':
-                    components = inp['components']
-                    component_types = [comp['type'] for comp in components]
-                    types.append(f"({','.join(component_types)})")
-                elif inp['type'].endswith('[]'):
-                    base_type = inp['type'][:-2]
-                    if base_type == 'tuple':
-                        components = inp['components']
-                        component_types = [comp['type'] for comp in components]
-                        types.append(f"({','.join(component_types)})[]")
-                    else:
-                        types.append(inp['type'])
-                else:
-                    types.append(inp['type'])
-            
-            decoded = decode_abi(types, data_bytes)
-            
-            # 构建参数列表
-            result = []
-            param_idx = 0
-            
-            for inp in func_abi['inputs']:
-                if inp['type'] == 'tuple':
-                    struct_data = decoded[param_idx]
-                    for i, comp in enumerate(inp['components']):
-                        result.append({
-                            'name': f"{inp['name']}.{comp['name']}",
-                            'type': comp['type'],
-                            'description': comp.get('description', ''),
-                            'data': struct_data[i].hex() if comp['type'] == 'bytes' and struct_data[i] else str(struct_data[i])
-                        })
-                elif inp['type'].endswith('[]'):
-                    if inp['type'] == 'tuple[]':
-                        array_data = decoded[param_idx]
-                        for j, struct_data in enumerate(array_data):
-                            for i, comp in enumerate(inp['components']):
-                                result.append({
-                                    'name': f"{inp['name']}[{j}].{comp['name']}",
-                                    'type': comp['type'],
-                                    'description': comp.get('description', ''),
-                                    'data': struct_data[i].hex() if comp['type'] == 'bytes' and struct_data[i] else str(struct_data[i])
-                                })
-                    else:
-                        array_data = decoded[param_idx]
-                        for j, value in enumerate(array_data):
-                            result.append({
-                                'name': f"{inp['name']}[{j}]",
-                                'type': inp['type'][:-2],
-                                'description': inp.get('description', ''),
-                                'data': str(value)
-                            })
-                else:
-                    result.append({
-                        'name': inp['name'],
-                        'type': inp['type'],
-                        'description': inp.get('description', ''),
-                        'data': str(decoded[param_idx])
-                    })
-                
-                param_idx += 1
+        results = []
+        for input_hex in input_hexes:
+            result = cache.get(input_hex)
+            if result is not None:
+                results.append(result)
+                continue
             
-            return result
+            try:
+                data_bytes = bytes.fromhex(input_hex[10:])  # 跳过 0x 和方法签名
+                result = build(decode(ContextFramesBytesIO(data_bytes)))
+            except Exception as e:
+                results.append([{'error': f'解码失败: {e}'}])
+                continue
             
-        except Exception as e:
-            return [{'error': f'解码失败: {e}'}]
+            if len(cache) >= DECODE_CACHE_SIZE:
+                del cache[next(iter(cache))]
+            cache[input_hex] = result
+            results.append(result)
+        return results
+
+
+# 解码进程数、每批读取的交易条数、每个进程任务块的条数
+DECODE_WORKERS = os.cpu_count() or 1
+READ_BATCH_SIZE = 8192
+DECODE_CHUNKSIZE = 512
+SHARD_OUTPUT_DIR = 'data/decoded_by_function'
+DECODE_CACHE_SIZE = 4096  # 每个进程缓存的calldata解码结果条数
+MAX_REPORTED_FAILURES = 20
+
+# 每个工作进程各自持有一个解码器实例
+_worker_decoder = None
+
+
+def _init_decode_worker():
+    """工作进程初始化：创建解码器"""
+    global _worker_decoder
+    _worker_decoder = CompletePolymarketABIDecoder()
+
+
+def decode_signature_group(group):
+    """解码一组同签名的calldata（在工作进程中执行）"""
+    method_sig, raw_inputs = group
+    return _worker_decoder.decode_many(method_sig, raw_inputs)
+
+
+def group_by_signature(eligible, chunk_size=DECODE_CHUNKSIZE):
+    """
+    按函数签名分组待解码交易，并切成不超过 chunk_size 的任务块
+
+    Args:
+        eligible: (交易序号, 交易, calldata) 列表
+        chunk_size: 每个任务块的最大条数
+
+    Returns:
+        (函数签名, eligible中的下标列表) 列表
+    """
+    buckets = {}
+    for pos, (_, _, raw_input) in enumerate(eligible):
+        buckets.setdefault(raw_input[:10], []).append(pos)
+    
+    groups = []
+    for method_sig, positions in buckets.items():
+        for start in range(0, len(positions), chunk_size):
+            groups.append((method_sig, positions[start:start + chunk_size]))
+    return groups
 
 
 def find_input_data_file():
@@ -287,6 +404,173 @@ def find_input_data_file():
     return None
 
 
+def _json_default(value):
+    """ijson 把小数读成 Decimal（以便整数保持任意精度），序列化时按原 json.load 的行为转成 float"""
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def dump_json_bytes(value, option=0):
+    """orjson序列化；超出64位的整数等orjson不支持的值回退到标准库"""
+    try:
+        return orjson.dumps(value, default=_json_default, option=option)
+    except TypeError:
+        indent = 2 if option & orjson.OPT_INDENT_2 else None
+        return json.dumps(value, indent=indent, ensure_ascii=False, default=_json_default).encode('utf-8')
+
+
+class FunctionShardWriter:
+    """
+    按函数名把交易分片写入 <shard_dir>/<函数名>.jsonl（每行一条交易）
+
+    先写到临时目录，成功结束后整体替换 shard_dir，上一次运行留下的旧分片不会残留
+    """
+
+    def __init__(self, shard_dir):
+        self.shard_dir = shard_dir
+        self.staging_dir = f'{shard_dir}.tmp'
+        self.files = {}
+        self.discarded = False
+
+    def __enter__(self):
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+        os.makedirs(self.staging_dir)
+        return self
+
+    def write(self, func_name, line):
+        """追加一行已序列化的交易"""
+        f = self.files.get(func_name)
+        if f is None:
+            f = open(os.path.join(self.staging_dir, f'{func_name}.jsonl'), 'wb')
+            self.files[func_name] = f
+        f.write(line)
+        f.write(b'\n')
+
+    def discard(self):
+        """放弃本次分片，退出时保留原有的 shard_dir 不动"""
+        self.discarded = True
+
+    def __exit__(self, exc_type, exc, tb):
+        for f in self.files.values():
+            f.close()
+        if exc_type is not None or self.discarded:
+            shutil.rmtree(self.staging_dir, ignore_errors=True)
+            return False
+
+        # 先把旧目录挪开再换入新目录，替换过程中 shard_dir 不会出现半新半旧的分片
+        old_dir = f'{self.shard_dir}.old'
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if os.path.exists(self.shard_dir):
+            os.rename(self.shard_dir, old_dir)
+        os.rename(self.staging_dir, self.shard_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+        return False
+
+
+def iter_transaction_batches(input_file, metadata, batch_size=READ_BATCH_SIZE):
+    """
+    按批流式读取交易，避免一次性加载整个文件
+
+    同一遍解析中顺带收集 transactions 以外的顶层字段，生成器耗尽后 metadata 才完整
+
+    Args:
+        input_file: 输入文件路径
+        metadata: 用于接收顶层字段的字典
+        batch_size: 每批交易条数
+    """
+    batch = []
+    builder = None
+    # 当前正在构建的值所在路径：交易为 'transactions.item'，其余顶层字段为字段名
+    value_prefix = None
+    key = None
+
+    with open(input_file, 'rb') as f:
+        for prefix, event, value in ijson.parse(f):
+            if prefix == '':
+                if event == 'map_key':
+                    key = value
+                    value_prefix = 'transactions.item' if key == 'transactions' else key
+                continue
+            if prefix == 'transactions' and key == 'transactions':
+                # 交易数组本身的 start_array/end_array
+                continue
+
+            if builder is None:
+                builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+            if prefix == value_prefix and event not in ('start_map', 'start_array', 'map_key'):
+                if key == 'transactions':
+                    batch.append(builder.value)
+                    if len(batch) >= batch_size:
+                        yield batch
+                        batch = []
+                else:
+                    metadata[key] = builder.value
+                builder = None
+
+    if batch:
+        yield batch
+
+
+def select_eligible(batch, supported_sigs, tx_no):
+    """
+    挑出批次中需要解码的交易，其余交易不进入解码流程
+
+    Args:
+        batch: 交易列表
+        supported_sigs: 支持的函数签名集合
+        tx_no: 本批次之前已读取的交易条数
+
+    Returns:
+        ((交易序号, 交易, calldata) 列表, 已解码而跳过的条数)
+    """
+    eligible = []
+    skipped = 0
+    for tx in batch:
+        tx_no += 1
+        raw_input = tx.get('input_data', {}).get('raw_input', '')
+        if not raw_input or len(raw_input) < 10:
+            continue
+        
+        # 跳过已解码的交易
+        if tx.get('decoded_input_data'):
+            skipped += 1
+        elif raw_input[:10] in supported_sigs:
+            eligible.append((tx_no, tx, raw_input))
+    return eligible, skipped
+
+
+def submit_decode_batches(pool, batches, supported_sigs):
+    """
+    流水线式提交解码任务：先提交下一批次，再交出上一批次
+
+    调用方写出上一批次时，工作进程已在解码下一批次，读、解码、写三者重叠
+
+    Yields:
+        (交易列表, eligible, 跳过条数, 签名分组, AsyncResult)
+    """
+    tx_no = 0
+    pending = None
+    for batch in batches:
+        eligible, skipped = select_eligible(batch, supported_sigs, tx_no)
+        tx_no += len(batch)
+        
+        # 按函数签名分组后异步发送给工作进程
+        groups = group_by_signature(eligible)
+        async_result = pool.map_async(
+            decode_signature_group,
+            [(method_sig, [eligible[pos][2] for pos in positions]) for method_sig, positions in groups]
+        )
+        
+        if pending is not None:
+            yield pending
+        pending = (batch, eligible, skipped, groups, async_result)
+    
+    if pending is not None:
+        yield pending
+
+
 def main():
     """主函数 - 生成完整ABI解码数据"""
     print('🚀 完整ABI解码数据生成脚本')
@@ -303,15 +587,12 @@ def main():
         return
     
     output_file = 'data/polymarket_complete_all_functions_decoded.json'
+    # 输入和输出可能是同一个文件，先写临时文件，完成后再替换
+    tmp_output_file = f'{output_file}.tmp'
     
-    print(f'📖 读取输入文件: {input_file}')
-    
-    # 读取数据
-    with open(input_file, 'r') as f:
-        data = json.load(f)
-    
-    transactions = data['transactions']
-    print(f'📊 总交易数: {len(transactions):,}')
+    print(f'📖 流式读取输入文件: {input_file}')
+    # 顶层字段在读取交易的同一遍解析中收集，读完交易后才完整
+    metadata = {}
     
     # 初始化解码器
     decoder = CompletePolymarketABIDecoder()
@@ -321,88 +602,151 @@ def main():
     for sig, info in decoder.function_abis.items():
         print(f'   {sig}: {info["name"]} - {info["description"]}')
     
-    # 统计当前解码状态
-    current_decoded = sum(1 for tx in transactions if tx.get('decoded_input_data'))
-    print(f'\\n📈 当前解码状态:')
-    print(f'   已解码交易: {current_decoded:,}')
-    print(f'   覆盖率: {current_decoded/len(transactions)*100:.1f}%')
-    
-    # 批量解码
+    # 边读边解码边写出
     print('\\n🔄 开始完整解码...')
+    total_count = 0
+    written_count = 0
     new_decoded_count = 0
     skipped_count = 0
+    function_stats = {}
+    failed_count = 0
+    failures = []  # 只保留前 MAX_REPORTED_FAILURES 条失败详情
+    
+    print(f'⚙️ 解码进程数: {DECODE_WORKERS}')
     
-    for i, tx in enumerate(transactions):
-        input_data = tx.get('input_data', {})
-        raw_input = input_data.get('raw_input', '')
+    with open(tmp_output_file, 'wb') as out, \
+            multiprocessing.Pool(DECODE_WORKERS, initializer=_init_decode_worker) as pool, \
+            FunctionShardWriter(SHARD_OUTPUT_DIR) as shards, \
+            tqdm(unit='tx', mininterval=0.5, desc='   解码进度') as progress:
+        out.write(b'{\n"transactions": [\n')
         
-        if raw_input and len(raw_input) >= 10:
-            method_sig = raw_input[:10]
+        # 分阶段累计耗时，用于判断瓶颈在解码（CPU）还是读写（I/O）
+        # 解码与读写重叠，'解码'只统计主进程等待工作进程的时间
+        phase_times = {'读取': 0.0, '解码': 0.0, '写出': 0.0}
+        mark = time.perf_counter()
+        
+        batches = submit_decode_batches(pool, iter_transaction_batches(input_file, metadata), supported_sigs)
+        for batch, eligible, skipped, groups, async_result in batches:
+            now = time.perf_counter()
+            phase_times['读取'] += now - mark
+            mark = now
             
-            # 跳过已解码的交易
-            if tx.get('decoded_input_data'):
-                skipped_count += 1
-                continue
-                
-            # 解码支持的函数
-            if method_sig in supported_sigs:
-                if (i + 1) % 1000 == 0:  # 每1000条显示进度
-                    print(f'   处理到第 {i+1:,} 条交易...')
-                
-                decoded_params = decoder.decode_function_input(raw_input)
-                
-                if decoded_params and not any(p.get('error') for p in decoded_params):
+            total_count += len(batch)
+            skipped_count += skipped
+            
+            # 等待本批次解码结果，按原顺序放回
+            group_results = async_result.get()
+            results = [None] * len(eligible)
+            for (_, positions), decoded_list in zip(groups, group_results):
+                for pos, decoded_params in zip(positions, decoded_list):
+                    results[pos] = decoded_params
+            
+            for (tx_no, tx, raw_input), decoded_params in zip(eligible, results):
+                method_sig = raw_input[:10]
+                # 解码失败时结果只有一个 {'error': ...} 元素，检查首元素即可
+                if decoded_params and 'error' not in decoded_params[0]:
                     tx['decoded_input_data'] = decoded_params
                     tx['decoded_function_name'] = decoder.function_abis[method_sig]['name']
                     tx['function_description'] = decoder.function_abis[method_sig]['description']
                     new_decoded_count += 1
                 else:
                     error_msg = decoded_params[0].get('error', 'unknown') if decoded_params else 'decode failed'
-                    print(f'   ⚠️ 解码失败 第{i+1}条: {error_msg}')
+                    failed_count += 1
+                    if len(failures) < MAX_REPORTED_FAILURES:
+                        failures.append((tx_no, error_msg))
+            
+            now = time.perf_counter()
+            phase_times['解码'] += now - mark
+            mark = now
+            
+            for tx in batch:
+                if tx.get('decoded_input_data'):
+                    func_name = tx.get('decoded_function_name', 'unknown')
+                    function_stats[func_name] = function_stats.get(func_name, 0) + 1
+                
+                line = dump_json_bytes(tx)
+                if written_count:
+                    out.write(b',\n')
+                out.write(line)
+                shards.write(tx.get('decoded_function_name', 'unknown'), line)
+                written_count += 1
+            
+            progress.update(len(batch))
+            
+            now = time.perf_counter()
+            phase_times['写出'] += now - mark
+            mark = now
+        
+        out.write(b'\n]')
+        
+        if not total_count:
+            # 没有交易时主输出不会被替换，分片也保持原样，两者保持一致
+            shards.discard()
+        
+        # 更新统计信息
+        final_decoded = sum(function_stats.values())
+        metadata['total_decoded_functions'] = final_decoded
+        metadata['supported_function_signatures'] = list(supported_sigs)
+        metadata['function_descriptions'] = {sig: info['description'] for sig, info in decoder.function_abis.items()}
+        metadata['last_updated'] = datetime.now().isoformat()
+        
+        for key, value in metadata.items():
+            out.write(b',\n' + orjson.dumps(key) + b': ' + dump_json_bytes(value, orjson.OPT_INDENT_2))
+        out.write(b'\n}\n')
+    
+    if not total_count:
+        os.remove(tmp_output_file)
+        print('❌ 输入文件中没有交易数据')
+        return
     
     print(f'\\n✅ 完整解码完成!')
     print(f'   新增解码交易: {new_decoded_count:,} 条')
     print(f'   跳过已解码: {skipped_count:,} 条')
     
-    # 更新统计信息
-    final_decoded = sum(1 for tx in transactions if tx.get('decoded_input_data'))
-    data['total_decoded_functions'] = final_decoded
-    data['supported_function_signatures'] = list(supported_sigs)
-    data['function_descriptions'] = {sig: info['description'] for sig, info in decoder.function_abis.items()}
-    data['last_updated'] = datetime.now().isoformat()
+    # 解码失败汇总输出，避免在解码循环中逐条打印
+    if failed_count:
+        print(f'   ⚠️ 解码失败: {failed_count:,} 条')
+        for tx_no, error_msg in failures:
+            print(f'      第{tx_no}条: {error_msg}')
+        if failed_count > len(failures):
+            print(f'      ... 其余 {failed_count - len(failures):,} 条省略')
     
     # 保存文件
     print(f'💾 保存完整数据到: {output_file}')
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_output_file, output_file)
     
     # 验证文件
     file_size = os.path.getsize(output_file)
     print(f'📄 文件大小: {file_size:,} 字节 ({file_size/1024/1024:.2f} MB)')
     
     print(f'\\n🎯 最终结果:')
-    print(f'   总交易数: {len(transactions):,}')
+    print(f'   总交易数: {total_count:,}')
     print(f'   已解码交易: {final_decoded:,}')
-    print(f'   解码覆盖率: {final_decoded/len(transactions)*100:.1f}%')
-    print(f'   新增解码率: {new_decoded_count/len(transactions)*100:.1f}%')
+    print(f'   解码覆盖率: {final_decoded/total_count*100:.1f}%')
+    print(f'   新增解码率: {new_decoded_count/total_count*100:.1f}%')
     
-    # 统计函数类型
-    function_stats = {}
-    for tx in transactions:
-        if tx.get('decoded_input_data'):
-            func_name = tx.get('decoded_function_name', 'unknown')
-            function_stats[func_name] = function_stats.get(func_name, 0) + 1
+    total_time = sum(phase_times.values())
+    if total_time > 0:
+        print(f'\\n⏱️ 阶段耗时:')
+        for phase, seconds in phase_times.items():
+            print(f'   {phase}: {seconds:.2f}s ({seconds/total_time*100:.1f}%)')
+        bottleneck = max(phase_times, key=phase_times.get)
+        if bottleneck == '解码':
+            print(f'   瓶颈在解码（CPU），可调大 DECODE_WORKERS')
+        else:
+            print(f'   瓶颈在{bottleneck}（I/O），增加解码进程收益有限')
     
     print(f'\\n🔧 函数类型统计:')
     for func_name, count in sorted(function_stats.items(), key=lambda x: x[1], reverse=True):
-        desc = decoder.function_abis.get(list(decoder.function_abis.keys())[list(decoder.function_abis.values()).index({'name': func_name, **decoder.function_abis[list(decoder.function_abis.keys())[0]]})], {}).get('description', '') if func_name != 'unknown' else ''
+        desc = decoder.desc_by_name.get(func_name, '')
         print(f'   {func_name}: {count:,} ({count/final_decoded*100:.1f}%) - {desc}')
     
     print('\\n✅ 完整ABI解码数据生成完成!')
     print(f'📄 输出文件: {output_file}')
+    print(f'📂 按函数分片: {SHARD_OUTPUT_DIR}/<函数名>.jsonl')
     print('\\n💡 使用提示:')
     print('  - 查看解码参数: data["transactions"][i]["decoded_input_data"]')
-    print('  - 查询特定函数: 按 decoded_function_name 过滤')
+    print('  - 查询特定函数: 按 decoded_function_name 过滤，或直接读取对应分片文件')
     print('  - 分析交易模式: 统计各函数调用频率')
 
 
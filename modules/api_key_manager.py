@@ -3,7 +3,11 @@
 从数据库 etherscan_accounts 表中读取API Keys，支持轮询和额度管理
 """
 
+import atexit
 import threading
+from collections import deque
+import time
+import weakref
 from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, date
 from sqlalchemy import create_engine, Column, Integer, String, DateTime, Date
@@ -14,8 +18,37 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Etherscan每日限额
+DAILY_KEY_LIMIT = 100000
+
+# 使用量写回数据库的合并策略：累计到一定次数或超过一定时间才批量写一次
+USAGE_FLUSH_BATCH_SIZE = 100
+USAGE_FLUSH_INTERVAL = 5.0
+
+# 连接池：空闲连接超过该秒数后回收，取用前先 ping，避免拿到被服务端断开的连接
+DB_POOL_SIZE = 5
+DB_POOL_RECYCLE = 3600
+
+# 使用量相关的单条语句，只构造一次，直接在连接上执行而不经过ORM Session
+UPDATE_USAGE_SQL = text("""
+    UPDATE etherscan_accounts
+    SET daily_used = daily_used + :delta,
+        last_used = NOW()
+    WHERE api_key = :api_key
+""")
+RESET_USAGE_SQL = text("UPDATE etherscan_accounts SET daily_used = 0")
+
 Base = declarative_base()
 
+# 存活的管理器实例（弱引用，不阻止回收），进程退出时统一写回未落库的使用量
+_live_managers = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_live_managers():
+    for manager in list(_live_managers):
+        manager.flush_usage()
+
 
 class EtherscanAccount(Base):
     """Etherscan账户模型"""
@@ -28,7 +61,7 @@ class EtherscanAccount(Base):
     proxy_user = Column(String(50))
     proxy_pass = Column(String(50))
     daily_used = Column(Integer, default=0)
-    daily_limit = Column(Integer, default=100000)  # Etherscan每日限额
+    daily_limit = Column(Integer, default=DAILY_KEY_LIMIT)
     last_used = Column(DateTime)
 
 
@@ -43,17 +76,37 @@ class APIKeyManager:
             db_url: 数据库连接URL
         """
         self.db_url = db_url
-        self.engine = create_engine(db_url, echo=False)
+        self.engine = create_engine(
+            db_url,
+            echo=False,
+            pool_size=DB_POOL_SIZE,
+            pool_pre_ping=True,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
 
-        # 轮询状态
+        # 轮询状态（由 self._lock 保护）
+        self._lock = threading.Lock()
         self.current_index = 0
         self.api_keys = []
         self.usage_count = {}
+        # 未达每日限额的Key在 api_keys 中的下标，按轮询顺序排列；用满的Key直接出队不再检查
+        self._available = deque()
+
+        # 尚未写回数据库的使用量增量 {api_key: delta}
+        self._pending_usage = {}
+        self._pending_total = 0
+        self._pending_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        _live_managers.add(self)
+
         self._load_api_keys()
 
     def _load_api_keys(self):
         """从数据库加载所有API Keys"""
+        # 先写回内存中累计的增量，否则重新加载会丢掉这部分使用量
+        self.flush_usage()
+
         session = self.SessionLocal()
         try:
             # 重置今日使用量（如果是新的一天）
@@ -69,6 +122,7 @@ class APIKeyManager:
                 self.api_keys.append(api_key)
                 self.usage_count[api_key] = account.daily_used or 0
 
+            self._rebuild_available()
             logger.info(f"从数据库加载了 {len(self.api_keys)} 个API Keys")
 
         except Exception as e:
@@ -76,9 +130,17 @@ class APIKeyManager:
             # 如果数据库不存在，创建一个空的列表
             self.api_keys = []
             self.usage_count = {}
+            self._rebuild_available()
         finally:
             session.close()
 
+    def _rebuild_available(self):
+        """按 api_keys 顺序重建可用Key队列"""
+        self.current_index = 0
+        self._available = deque(
+            i for i, api_key in enumerate(self.api_keys) if self._is_key_available(api_key)
+        )
+
     def _reset_daily_usage_if_needed(self, session: Session):
         """检查是否需要重置每日使用量"""
         try:
@@ -104,26 +166,23 @@ class APIKeyManager:
             logger.warning("没有可用的API Keys")
             return None
 
-        with threading.Lock():
-            # 尝试找到可用的API Key
-            start_index = self.current_index
-            checked_count = 0
+        with self._lock:
+            if self._available:
+                index = self._available.popleft()
+                api_key = self.api_keys[index]
+                self.usage_count[api_key] += 1
 
-            while checked_count < len(self.api_keys):
-                api_key = self.api_keys[self.current_index]
-
-                # 检查是否可用（未达到每日限额）
+                # 用完这一次后仍未达每日限额的Key排回队尾，否则出队
                 if self._is_key_available(api_key):
-                    self.usage_count[api_key] += 1
-                    self.current_index = (self.current_index + 1) % len(self.api_keys)
-
-                    # 更新数据库
-                    self._update_key_usage(api_key)
-                    return api_key
+                    self._available.append(index)
+                self.current_index = self._available[0] if self._available else index
+            else:
+                api_key = None
 
-                # 移动到下一个
-                self.current_index = (self.current_index + 1) % len(self.api_keys)
-                checked_count += 1
+        if api_key is not None:
+            # 更新数据库（可能触发批量写回，放在锁外执行）
+            self._update_key_usage(api_key)
+            return api_key
 
         logger.error("所有API Keys都达到每日限额")
         return None
@@ -131,24 +190,46 @@ class APIKeyManager:
     def _is_key_available(self, api_key: str) -> bool:
         """检查API Key是否可用"""
         daily_used = self.usage_count.get(api_key, 0)
-        return daily_used < 100000  # Etherscan每日限额
+        return daily_used < DAILY_KEY_LIMIT
 
     def _update_key_usage(self, api_key: str):
-        """更新API Key使用统计"""
-        session = self.SessionLocal()
+        """记录API Key使用量，累计到批量大小或刷新间隔后再统一写回数据库"""
+        with self._pending_lock:
+            self._pending_usage[api_key] = self._pending_usage.get(api_key, 0) + 1
+            self._pending_total += 1
+            due = (self._pending_total >= USAGE_FLUSH_BATCH_SIZE
+                   or time.monotonic() - self._last_flush >= USAGE_FLUSH_INTERVAL)
+
+        if due:
+            self.flush_usage()
+
+    def flush_usage(self):
+        """将累计的使用量增量一次性写回数据库（写入失败时增量保留到下次再写）"""
+        with self._pending_lock:
+            pending = self._pending_usage
+            self._pending_usage = {}
+            self._pending_total = 0
+            self._last_flush = time.monotonic()
+
+        if not pending:
+            return
+
         try:
-            session.execute(text("""
-                UPDATE etherscan_accounts
-                SET daily_used = daily_used + 1,
-                    last_used = NOW()
-                WHERE api_key = :api_key
-            """), {'api_key': api_key})
-            session.commit()
+            with self.engine.begin() as conn:
+                conn.execute(UPDATE_USAGE_SQL,
+                             [{'api_key': key, 'delta': delta} for key, delta in pending.items()])
         except Exception as e:
             logger.error(f"更新API Key使用统计失败: {e}")
-            session.rollback()
-        finally:
-            session.close()
+            with self._pending_lock:
+                for key, delta in pending.items():
+                    self._pending_usage[key] = self._pending_usage.get(key, 0) + delta
+                    self._pending_total += delta
+
+    def close(self):
+        """写回未落库的使用量并释放数据库连接池"""
+        self.flush_usage()
+        _live_managers.discard(self)
+        self.engine.dispose()
 
     def get_current_key(self) -> Optional[str]:
         """
@@ -168,34 +249,37 @@ class APIKeyManager:
         Returns:
             包含使用统计的字典
         """
-        with threading.Lock():
-            total_usage = sum(self.usage_count.values())
-            available_keys = sum(1 for key in self.api_keys if self._is_key_available(key))
-
-            return {
-                'total_keys': len(self.api_keys),
-                'available_keys': available_keys,
-                'total_usage': total_usage,
-                'key_usage': self.usage_count.copy(),
-                'current_index': self.current_index
-            }
+        # 锁内只做快照，统计计算放在锁外，不阻塞 get_next_key
+        with self._lock:
+            key_usage = self.usage_count.copy()
+            current_index = self.current_index
+
+        return {
+            'total_keys': len(key_usage),
+            'available_keys': sum(1 for used in key_usage.values() if used < DAILY_KEY_LIMIT),
+            'total_usage': sum(key_usage.values()),
+            'key_usage': key_usage,
+            'current_index': current_index
+        }
 
     def reset_usage(self):
         """重置使用计数"""
-        session = self.SessionLocal()
+        # 丢弃尚未写回的增量，避免清零后又被加回去
+        with self._pending_lock:
+            self._pending_usage = {}
+            self._pending_total = 0
+
         try:
-            session.execute(text("UPDATE etherscan_accounts SET daily_used = 0"))
-            session.commit()
+            with self.engine.begin() as conn:
+                conn.execute(RESET_USAGE_SQL)
 
-            with threading.Lock():
+            with self._lock:
                 self.usage_count = {key: 0 for key in self.api_keys}
+                self._rebuild_available()
 
             logger.info("API Key使用计数已重置")
         except Exception as e:
             logger.error(f"重置使用计数失败: {e}")
-            session.rollback()
-        finally:
-            session.close()
 
     def add_api_key(self, api_key: str, proxy_info: Optional[Dict] = None):
         """
@@ -221,14 +305,17 @@ class APIKeyManager:
                 proxy_user=proxy_info.get('user') if proxy_info else None,
                 proxy_pass=proxy_info.get('pass') if proxy_info else None,
                 daily_used=0,
-                daily_limit=100000
+                daily_limit=DAILY_KEY_LIMIT
             )
 
             session.add(account)
             session.commit()
 
-            # 重新加载
-            self._load_api_keys()
+            # 新Key直接追加到内存中的轮询状态，无需整表重新加载
+            with self._lock:
+                self.api_keys.append(api_key)
+                self.usage_count[api_key] = 0
+                self._available.append(len(self.api_keys) - 1)
 
             logger.info(f"成功添加API Key: {api_key[:10]}...")
 
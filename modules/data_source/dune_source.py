@@ -10,6 +10,11 @@ import pandas as pd
 from config import config
 from .base import BaseDataSource, DataSourceError
 
+# 查询状态轮询：先快后慢，短查询能尽快拿到结果，长查询不会频繁请求
+POLL_INITIAL_INTERVAL = 0.5
+POLL_MAX_INTERVAL = 5.0
+QUERY_WAIT_TIMEOUT = 60  # 最长等待秒数
+
 
 class DuneDataSource(BaseDataSource):
     """Dune Analytics 数据源"""
@@ -95,10 +100,11 @@ class DuneDataSource(BaseDataSource):
         if not self.session:
             raise DataSourceError("Session 未初始化")
 
-        max_attempts = 30  # 最多等待30次
-        attempt = 0
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + QUERY_WAIT_TIMEOUT
+        interval = POLL_INITIAL_INTERVAL
 
-        while attempt < max_attempts:
+        while loop.time() < deadline:
             try:
                 status_url = f"{self.config['base_url']}/execution/{execution_id}/status"
                 async with self.session.get(status_url) as response:
@@ -114,9 +120,9 @@ class DuneDataSource(BaseDataSource):
                     elif status_data["state"] == "QUERY_STATE_FAILED":
                         raise DataSourceError("Dune 查询执行失败")
 
-                # 等待一段时间后重试
-                await asyncio.sleep(2)
-                attempt += 1
+                # 等待一段时间后重试，间隔逐步加倍
+                await asyncio.sleep(interval)
+                interval = min(interval * 2, POLL_MAX_INTERVAL)
 
             except Exception as e:
                 self.logger.error(f"获取查询结果失败: {e}")
@@ -12,6 +12,9 @@ from web3.exceptions import ContractLogicError
 from config import config
 from .base import BaseDataSource, DataSourceError
 
+# 并发查询区块时间戳的最大并发数
+BLOCK_FETCH_WORKERS = 8
+
 
 class OnChainDataSource(BaseDataSource):
     """区块链数据源"""
@@ -88,6 +91,17 @@ class OnChainDataSource(BaseDataSource):
             # 获取事件日志
             logs = event_filter.get_all_entries()
 
+            # 同一区块的日志只查询一次时间戳，不同区块在线程中并发查询，不阻塞事件循环
+            block_numbers = list({log.blockNumber for log in logs})
+            semaphore = asyncio.Semaphore(BLOCK_FETCH_WORKERS)
+
+            async def fetch_block_timestamp(block_number):
+                async with semaphore:
+                    return await asyncio.to_thread(self._get_block_timestamp, block_number)
+
+            timestamps = await asyncio.gather(*(fetch_block_timestamp(b) for b in block_numbers))
+            block_times = dict(zip(block_numbers, timestamps))
+
             # 解析事件数据
             events_data = []
             for log in logs:
@@ -95,7 +109,7 @@ class OnChainDataSource(BaseDataSource):
                     "block_number": log.blockNumber,
                     "transaction_hash": log.transactionHash.hex(),
                     "log_index": log.logIndex,
-                    "timestamp": self._get_block_timestamp(log.blockNumber),
+                    "timestamp": block_times[log.blockNumber],
                     **dict(log.args)
                 }
                 events_data.append(event_data)
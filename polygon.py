@@ -4,15 +4,70 @@ Polygon 链数据抓取模块
 """
 
 import requests
-import json
+from requests.adapters import HTTPAdapter
 import os
+import random
+import threading
+import time
 from typing import List, Dict, Optional, Union, Tuple
 import logging
+import orjson
 from modules.api_key_manager import APIKeyManager
 from config import config
 
 logger = logging.getLogger(__name__)
 
+# Etherscan/Polygonscan 限制每个API Key 5次/秒，留出余量
+REQUESTS_PER_SECOND_PER_KEY = 4.5
+
+# Polymarket ERC1155合约（Conditional Tokens）及 TransferSingle 事件签名
+CONDITIONAL_TOKENS_ADDRESS = "0x4D97DCd97eC945f40cF65F87097ACe5EA0476045"
+TRANSFER_SINGLE_TOPIC = "0xc3d58168c5ae7397731d063d5bbf3d657854427343f4c083240f7aacaa2d0f62"
+
+# 重试退避：delay = uniform(0, min(cap, base * 2**attempt))（full jitter）
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE, cap: float = BACKOFF_CAP) -> float:
+    """
+    计算第attempt次重试前的等待时间（指数退避 + 全抖动），避免并发请求同步重试
+
+    Args:
+        attempt: 已失败次数（从0开始）
+        base: 基础等待秒数
+        cap: 等待上限秒数
+
+    Returns:
+        等待秒数
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class KeyRateLimiter:
+    """按API Key分别限速，保证每个Key的请求间隔不低于 1/rate 秒"""
+
+    def __init__(self, rate: float = REQUESTS_PER_SECOND_PER_KEY):
+        """
+        初始化限速器
+
+        Args:
+            rate: 每个Key每秒允许的请求数
+        """
+        self.interval = 1.0 / rate
+        self._next_allowed = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, api_key: str):
+        """阻塞直到该Key可以发送下一次请求"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_allowed.get(api_key, now))
+            self._next_allowed[api_key] = slot + self.interval
+        wait = slot - now
+        if wait > 0:
+            time.sleep(wait)
+
 
 class MarketDataLoader:
     """从data目录加载Polymarket市场数据"""
@@ -28,19 +83,26 @@ class MarketDataLoader:
         self.markets_data = {}
         self._load_all_market_data()
 
+        # 预先转换小写问题文本，关键词搜索时不再逐条 lower()
+        self._questions_lower = {
+            condition_id: (market.get('question') or '').lower()
+            for condition_id, market in self.markets_data.items()
+        }
+
     def _load_all_market_data(self):
         """加载所有市场数据文件"""
         if not os.path.exists(self.data_dir):
             logger.warning(f"数据目录不存在: {self.data_dir}")
             return
 
-        # 查找所有polymarket_markets_*.json文件
-        for filename in os.listdir(self.data_dir):
-            if filename.startswith("polymarket_markets_") and filename.endswith(".json"):
-                filepath = os.path.join(self.data_dir, filename)
+        # 查找所有polymarket_markets_*.json文件（scandir 一次遍历即可拿到完整路径和文件类型）
+        for entry in os.scandir(self.data_dir):
+            filename = entry.name
+            if filename.startswith("polymarket_markets_") and filename.endswith(".json") and entry.is_file():
+                filepath = entry.path
                 try:
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
+                    with open(filepath, 'rb') as f:
+                        data = orjson.loads(f.read())
 
                     # 提取市场数据
                     markets = data.get('markets', [])
@@ -51,8 +113,8 @@ class MarketDataLoader:
                             clob_token_ids = market.get('clobTokenIds', '[]')
                             if isinstance(clob_token_ids, str):
                                 try:
-                                    token_ids = json.loads(clob_token_ids)
-                                except:
+                                    token_ids = orjson.loads(clob_token_ids)
+                                except orjson.JSONDecodeError:
                                     token_ids = []
                             else:
                                 token_ids = clob_token_ids if isinstance(clob_token_ids, list) else []
@@ -133,12 +195,11 @@ class MarketDataLoader:
         results = []
         keyword_lower = keyword.lower()
 
-        for condition_id, market in self.markets_data.items():
-            question = market.get('question', '').lower()
+        for condition_id, question in self._questions_lower.items():
             if keyword_lower in question:
                 results.append({
                     'condition_id': condition_id,
-                    **market
+                    **self.markets_data[condition_id]
                 })
 
         return results
@@ -161,10 +222,15 @@ class PolygonClient:
             raise ValueError("必须提供数据库连接URL")
 
         self.api_key_manager = APIKeyManager(db_url)
+        self.rate_limiter = KeyRateLimiter()
+
+        # 复用TCP/TLS连接；重试和Key轮换由 _make_request 自行处理，这里不挂Retry
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=10))
         self.base_url = config.api.POLYGONSCAN_V2_BASE_URL
         self.chain_id = config.api.POLYGON_CHAIN_ID
-        self.contract_address = "0x4D97DCd97eC945f40cF65F87097ACe5EA0476045"  # Polymarket ERC1155合约
-        self.transfer_single_topic = "0xc3d58168c5ae7397731d063d5bbf3d657854427343f4c083240f7aacaa2d0f62"
+        self.contract_address = CONDITIONAL_TOKENS_ADDRESS
+        self.transfer_single_topic = TRANSFER_SINGLE_TOPIC
 
         # 初始化市场数据加载器
         self.market_loader = MarketDataLoader()
@@ -181,6 +247,25 @@ class PolygonClient:
         Returns:
             交易记录列表
         """
+        return self.get_logs_batch([{'condition_id': condition_id, 'token_id': token_id}], limit=limit)[0]
+
+    def get_logs_batch(self, filters: List[Dict], limit: int = 20) -> List[List[Dict]]:
+        """
+        一次API请求获取多组过滤条件的ERC-1155 TransferSingle事件logs
+
+        所有过滤条件共用同一个getLogs查询，只请求一次、解析一次，再按过滤条件分发
+
+        Args:
+            filters: 过滤条件列表，每项可包含 'condition_id' 和 'token_id'
+            limit: 每组过滤条件返回记录数量限制
+
+        Returns:
+            与filters顺序一致的交易记录列表
+        """
+        batches = [[] for _ in filters]
+        if not filters:
+            return batches
+
         # 构建API参数
         params = {
             'chainid': self.chain_id,
@@ -196,55 +281,77 @@ class PolygonClient:
         response_data = self._make_request(params)
         if not response_data or 'result' not in response_data:
             logger.warning("API请求失败或无结果")
-            return []
+            return batches
 
         logs = response_data['result']
         if not logs:
-            return []
+            return batches
 
         # 解析和过滤结果
-        results = []
+        pending = len(filters)
         for log in reversed(logs):  # 从最新的开始
             parsed_log = self._parse_transfer_log(log)
             if not parsed_log:
                 continue
 
-            # 应用过滤器
-            if condition_id is not None:
-                # conditionId是tokenId的高128位
-                token_id_val = parsed_log.get('tokenId', 0)
-                if isinstance(token_id_val, str):
-                    try:
-                        token_id_int = int(token_id_val, 16) if token_id_val.startswith('0x') else int(token_id_val)
-                    except ValueError:
-                        continue
-                else:
-                    token_id_int = token_id_val
-
-                expected_condition_id = f"0x{token_id_int >> 128:064x}"
-                if expected_condition_id != condition_id:
+            for filt, results in zip(filters, batches):
+                if len(results) >= limit:
                     continue
-
-            if token_id is not None:
-                token_id_val = parsed_log.get('tokenId')
-                if token_id_val is None:
+                if not self._match_log_filter(parsed_log, filt.get('condition_id'), filt.get('token_id')):
                     continue
 
-                # 统一转换为字符串比较
-                if isinstance(token_id_val, str):
-                    parsed_token_id_str = token_id_val
-                else:
-                    parsed_token_id_str = str(token_id_val)
-
-                filter_token_id_str = str(token_id)
-                if parsed_token_id_str != filter_token_id_str:
-                    continue
+                results.append(parsed_log)
+                if len(results) >= limit:
+                    pending -= 1
 
-            results.append(parsed_log)
-            if len(results) >= limit:
+            if not pending:
                 break
 
-        return results
+        return batches
+
+    @staticmethod
+    def _match_log_filter(parsed_log: Dict, condition_id: Optional[str], token_id: Optional[str]) -> bool:
+        """
+        检查解析后的日志是否满足过滤条件
+
+        Args:
+            parsed_log: 解析后的交易记录
+            condition_id: conditionId过滤器
+            token_id: tokenId过滤器
+
+        Returns:
+            是否匹配
+        """
+        if condition_id is not None:
+            # conditionId是tokenId的高128位
+            token_id_val = parsed_log.get('tokenId', 0)
+            if isinstance(token_id_val, str):
+                try:
+                    token_id_int = int(token_id_val, 16) if token_id_val.startswith('0x') else int(token_id_val)
+                except ValueError:
+                    return False
+            else:
+                token_id_int = token_id_val
+
+            expected_condition_id = f"0x{token_id_int >> 128:064x}"
+            if expected_condition_id != condition_id:
+                return False
+
+        if token_id is not None:
+            token_id_val = parsed_log.get('tokenId')
+            if token_id_val is None:
+                return False
+
+            # 统一转换为字符串比较
+            if isinstance(token_id_val, str):
+                parsed_token_id_str = token_id_val
+            else:
+                parsed_token_id_str = str(token_id_val)
+
+            if parsed_token_id_str != str(token_id):
+                return False
+
+        return True
 
     def get_market_logs(self, market_query: str, limit: int = 20) -> Tuple[Dict, List[Dict]]:
         """
@@ -332,23 +439,20 @@ class PolygonClient:
                 return result
             token_ids = [token_id]
 
-        # 4. 为每个 tokenId 获取交易记录
-        for tid in token_ids:
-            try:
-                # 将 tokenId 转换为字符串格式进行API调用
-                token_id_str = str(tid)
-
-                # 获取该 token 的交易记录
-                trades = self.get_logs(token_id=token_id_str, limit=limit)
-
-                if trades:
-                    result['token_trades'][tid] = trades
-                    result['total_trades'] += len(trades)
-                    logger.info(f"TokenId {tid}: 获取到 {len(trades)} 条交易记录")
-
-            except Exception as e:
-                logger.error(f"获取 tokenId {tid} 交易失败: {e}")
-                continue
+        # 4. 所有 tokenId 共用一次API请求获取交易记录
+        try:
+            # 将 tokenId 转换为字符串格式进行过滤
+            filters = [{'token_id': str(tid)} for tid in token_ids]
+            token_trades = self.get_logs_batch(filters, limit=limit)
+        except Exception as e:
+            logger.error(f"获取 tokenIds {token_ids} 交易失败: {e}")
+            token_trades = [[] for _ in token_ids]
+
+        for tid, trades in zip(token_ids, token_trades):
+            if trades:
+                result['token_trades'][tid] = trades
+                result['total_trades'] += len(trades)
+                logger.info(f"TokenId {tid}: 获取到 {len(trades)} 条交易记录")
 
         logger.info(f"市场 {condition_id} 总共获取到 {result['total_trades']} 条交易记录，涉及 {len(result['token_trades'])} 个token")
         return result
@@ -445,13 +549,19 @@ class PolygonClient:
                 request_params = params.copy()
                 request_params['apikey'] = api_key
 
-                # 发送请求
-                response = requests.get(
+                # 按Key限速后发送请求
+                self.rate_limiter.acquire(api_key)
+                response = self.session.get(
                     self.base_url,
                     params=request_params,
                     timeout=timeout
                 )
 
+                if response.status_code == 429:
+                    logger.warning(f"触发限流 (尝试 {attempt + 1}/{max_retries})，退避重试")
+                    time.sleep(backoff_delay(attempt))
+                    continue
+
                 response.raise_for_status()
                 data = response.json()
 
@@ -467,6 +577,12 @@ class PolygonClient:
                     if 'api key' in error_msg.lower():
                         continue
 
+                    # 限流错误（HTTP 200 + rate limit 提示），退避后重试
+                    result_msg = str(data.get('result', ''))
+                    if 'rate limit' in error_msg.lower() or 'rate limit' in result_msg.lower():
+                        time.sleep(backoff_delay(attempt))
+                        continue
+
                     # 其他错误返回结果
                     return data
 
@@ -475,6 +591,7 @@ class PolygonClient:
                 if attempt == max_retries - 1:
                     logger.error(f"所有重试都失败: {e}")
                     return None
+                time.sleep(backoff_delay(attempt))
                 continue
 
             except Exception as e:
@@ -22,9 +22,17 @@ API端点示例：
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import functools
 import json
 import os
+import re
+import sys
+import orjson
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from cache import FileCache
 
 # ----------------------------
 # 配置
@@ -37,6 +45,14 @@ HEADERS = {
     "Referer": "https://polymarket.com/"
 }
 
+# 全局共享Session：复用TCP/TLS连接，并对限流和5xx错误自动退避重试
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=10,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+))
+
 GAMMA_BASE = "https://gamma-api.polymarket.com"
 CLOB_BASE = "https://clob.polymarket.com"
 
@@ -44,10 +60,74 @@ TARGET_CATEGORIES = ["Politics", "Crypto", "Sports"]
 MARKET_PER_CATEGORY = 10
 DATA_DIR = "data"
 
+# Polymarket真实合约地址（来自官方文档和区块链验证）
+POLYMARKET_CONTRACTS = {
+    "conditional_tokens": "0x4D97DCd97eC945f40cF65F87097ACe5EA0476045",  # Conditional Tokens主合约
+    "clob_exchange": "0x4bfb41d5b3570defd03c39a9a4d8de6bd8b8982e",     # CLOb Exchange合约
+    "fee_module": "0xE3f18aCc55091e2c48d883fc8C8413319d4Ab7b0"        # Fee Module合约
+}
+
+# Gamma /markets 响应磁盘缓存：已结束市场几乎不变，活跃市场缓存较短
+GAMMA_CACHE = FileCache(os.path.join(".cache", "gamma"))
+# 按时间/交易量排序的列表查询会随市场新建和结束而变化，只能短时间缓存；
+# 只有指定具体市场/条件的已结束市场查询才长期缓存
+GAMMA_LIST_TTL = 3600           # 1小时
+GAMMA_MARKET_TTL = 24 * 3600    # 24小时
+GAMMA_MARKET_KEYS = ("id", "slug", "condition_ids", "clob_token_ids")
+# 设置环境变量 POLYMARKET_NO_CACHE=1 可跳过缓存读取，强制重新抓取
+GAMMA_CACHE_ENABLED = os.environ.get("POLYMARKET_NO_CACHE", "").lower() not in ("1", "true", "yes")
+
+
+def _keyword_pattern(keywords):
+    """将关键词列表编译为一个不区分大小写的子串匹配正则"""
+    return re.compile("|".join(re.escape(k) for k in keywords), re.IGNORECASE)
+
+
+# 加密货币市场过滤规则（每个市场只做一次正则扫描，而不是逐个关键词查找）
+CRYPTO_KEYWORDS_RE = _keyword_pattern([
+    'bitcoin', 'btc', 'ethereum', 'eth', 'solana', 'xrp', 'chainlink', 'polygon', 'bnb', 'ada',
+    'doge', 'shib', 'matic', 'blockchain', 'defi', 'nft'
+])
+# 排除政治相关的关键词（因为政治市场有时会包含crypto相关的错误匹配）
+CRYPTO_EXCLUDE_RE = _keyword_pattern([
+    'biden', 'trump', 'election', 'president', 'political', 'government', 'democratic', 'republican',
+    'nevada', 'swing', 'candidate', 'nomination', 'press conference', 'coronavirus'
+])
+# 价格预测、达到目标价位等各种加密货币相关问题
+CRYPTO_PRICE_RE = _keyword_pattern([
+    'price', 'hit', 'reach', 'above', 'below', '$', 'usd', 'market cap', 'fdv', 'valuation',
+    'up or down', 'trading', 'exchange', 'will'
+])
+
 # ----------------------------
 # 函数
 # ----------------------------
 
+def parse_json_response(r):
+    """用orjson解析响应体；解析失败时回退到 r.json()，保持 requests 原有的异常类型"""
+    try:
+        return orjson.loads(r.content)
+    except orjson.JSONDecodeError:
+        return r.json()
+
+def fetch_gamma_markets(params, timeout=10, headers=HEADERS, use_cache=GAMMA_CACHE_ENABLED):
+    """获取 Gamma /markets 列表，优先读取磁盘缓存（use_cache=False 时跳过读取，结果仍写回缓存）"""
+    url = f"{GAMMA_BASE}/markets"
+    keyed_on_market = any(k in params for k in GAMMA_MARKET_KEYS)
+    ttl = GAMMA_MARKET_TTL if keyed_on_market and params.get("closed") == "true" else GAMMA_LIST_TTL
+    key = FileCache.make_key(url, params)
+
+    if use_cache:
+        cached = GAMMA_CACHE.get(key, ttl)
+        if cached is not None:
+            return cached
+
+    r = SESSION.get(url, headers=headers, params=params, timeout=timeout)
+    r.raise_for_status()
+    data = parse_json_response(r)
+    GAMMA_CACHE.set(key, data)
+    return data
+
 def get_sport_display_name(sport_code):
     """将运动类型缩写转换为可读名称"""
     sport_names = {
@@ -135,8 +215,6 @@ def analyze_sports_season():
 
 def fetch_markets_by_category_fallback(category, limit=3):
     """通用市场API回退函数，避免递归调用"""
-    url = f"{GAMMA_BASE}/markets"
-
     # 获取更多市场以提高找到体育赛事的机会
     params = {
         "active": "true",
@@ -146,9 +224,7 @@ def fetch_markets_by_category_fallback(category, limit=3):
     }
 
     try:
-        r = requests.get(url, headers=HEADERS, params=params, timeout=10)
-        r.raise_for_status()
-        all_markets = r.json()
+        all_markets = fetch_gamma_markets(params, timeout=10)
 
         # 扩展体育关键词列表
         sports_keywords = [
@@ -203,9 +279,9 @@ def fetch_sports_leagues():
     """获取所有支持的体育联赛"""
     url = f"{GAMMA_BASE}/sports"
     try:
-        r = requests.get(url, headers=HEADERS, timeout=10)
+        r = SESSION.get(url, headers=HEADERS, timeout=10)
         r.raise_for_status()
-        data = r.json()
+        data = parse_json_response(r)
 
         # 调试信息：打印API响应结构
         if data and len(data) > 0:
@@ -247,9 +323,9 @@ def fetch_sports_events(series_id, tag_id=None, limit=10, active_only=False):
         print(f"  🔍 过滤游戏投注 (tag_id={tag_id})")
 
     try:
-        r = requests.get(url, headers=HEADERS, params=params, timeout=10)
+        r = SESSION.get(url, headers=HEADERS, params=params, timeout=10)
         r.raise_for_status()
-        all_events = r.json()
+        all_events = parse_json_response(r)
 
         # 过滤2025年9月之后的数据
         cutoff_date = "2025-11-01T00:00:00Z"
@@ -270,9 +346,9 @@ def fetch_sports_events(series_id, tag_id=None, limit=10, active_only=False):
         print(f"❌ 获取联赛 {series_id} 赛事失败: {e}")
         return []
 
-def fetch_sports_markets(limit=3):
-    """获取真实的体育预测市场数据（从Markets API）"""
-    print("  🏆 获取真实的体育预测市场...")
+def fetch_sports_markets(limit=3, log=print):
+    """获取真实的体育预测市场数据（从Markets API），进度信息通过 log 输出"""
+    log("  🏆 获取真实的体育预测市场...")
 
     # 体育关键词，用于识别体育市场
     sports_keywords = [
@@ -301,7 +377,6 @@ def fetch_sports_markets(limit=3):
 
     try:
         # 从Markets API获取活跃的体育市场
-        markets_url = f"{GAMMA_BASE}/markets"
         params = {
             "active": "true",
             "closed": "false",
@@ -310,17 +385,22 @@ def fetch_sports_markets(limit=3):
             "ascending": "false"
         }
 
-        r = requests.get(markets_url, headers=HEADERS, params=params, timeout=15)
-        r.raise_for_status()
-        all_markets = r.json()
+        all_markets = fetch_gamma_markets(params, timeout=15)
 
-        print(f"  📊 从 {len(all_markets)} 个活跃市场中筛选体育市场...")
+        log(f"  📊 从 {len(all_markets)} 个活跃市场中筛选体育市场...")
 
         # 筛选体育市场
         for market in all_markets:
             if len(markets) >= limit:
                 break
 
+            # 先做廉价的数值检查：验证这是否是真正的体育市场（有赔率和交易量）
+            # volumeNum 可能为 null，这里会对所有市场执行，必须兜底为 0
+            volume = market.get("volumeNum") or 0
+            outcome_prices = market.get("outcomePrices", [])
+            if not (volume > 1000 and outcome_prices and len(outcome_prices) >= 2):
+                continue
+
             question = market.get("question", "").lower()
             description = market.get("description", "").lower()
 
@@ -339,21 +419,16 @@ def fetch_sports_markets(limit=3):
                 has_team_names = any(team in outcome_text for team in ['fc', 'united', 'city', 'liverpool', 'chelsea', 'lakers', 'celtics'])
 
             if has_sports_keyword and not has_exclude_keyword and (has_team_names or 'vs' in question):
-                # 验证这是否是真正的体育市场（有赔率和交易量）
-                volume = market.get("volumeNum", 0)
-                outcome_prices = market.get("outcomePrices", [])
-                liquidity = market.get("liquidityNum", 0)
-
-                if volume > 1000 and outcome_prices and len(outcome_prices) >= 2:  # 有实际交易的体育市场
-                    market_copy = market.copy()
-                    market_copy["data_source"] = "markets_api"
-                    market_copy["sport_type"] = "Sports"
-                    markets.append(market_copy)
-                    print(f"  ✅ 发现体育市场: {market['question'][:50]}... (交易量: {volume})")
+                # 有实际交易的体育市场
+                market_copy = market.copy()
+                market_copy["data_source"] = "markets_api"
+                market_copy["sport_type"] = "Sports"
+                markets.append(market_copy)
+                log(f"  ✅ 发现体育市场: {market['question'][:50]}... (交易量: {volume})")
 
         # 如果活跃市场不够，补充一些已结束但仍有价值的体育市场
         if len(markets) < limit:
-            print(f"  🔄 活跃体育市场不足({len(markets)}/{limit})，补充已结束市场...")
+            log(f"  🔄 活跃体育市场不足({len(markets)}/{limit})，补充已结束市场...")
 
             params_closed = {
                 "closed": "true",
@@ -362,44 +437,44 @@ def fetch_sports_markets(limit=3):
                 "ascending": "false"
             }
 
-            r_closed = requests.get(markets_url, headers=HEADERS, params=params_closed, timeout=15)
-            r_closed.raise_for_status()
-            closed_markets = r_closed.json()
+            closed_markets = fetch_gamma_markets(params_closed, timeout=15)
 
             for market in closed_markets:
                 if len(markets) >= limit:
                     break
 
+                # 对于已结束市场，降低交易量要求（先做廉价的数值检查）
+                volume = market.get("volumeNum") or 0
+                outcome_prices = market.get("outcomePrices", [])
+                if not (volume > 5000 and outcome_prices):
+                    continue
+
                 question = market.get("question", "").lower()
                 description = market.get("description", "").lower()
 
                 has_sports_keyword = any(keyword in question for keyword in sports_keywords)
                 has_exclude_keyword = any(exclude in question or exclude in description for exclude in exclude_keywords)
 
-                volume = market.get("volumeNum", 0)
-                outcome_prices = market.get("outcomePrices", [])
-
-                # 对于已结束市场，降低交易量要求
-                if has_sports_keyword and not has_exclude_keyword and volume > 5000 and outcome_prices:
+                if has_sports_keyword and not has_exclude_keyword:
                     # 避免重复
                     if not any(m.get("id") == market.get("id") for m in markets):
                         market_copy = market.copy()
                         market_copy["data_source"] = "markets_api_closed"
                         market_copy["sport_type"] = "Sports"
                         markets.append(market_copy)
-                        print(f"  ✅ 补充已结束体育市场: {market['question'][:50]}... (交易量: {volume})")
+                        log(f"  ✅ 补充已结束体育市场: {market['question'][:50]}... (交易量: {volume})")
 
         if markets:
             complete_markets = [m for m in markets if m.get("outcomes") and m.get("outcomePrices")]
-            print(f"  ✅ 成功获取 {len(markets)} 个真实体育预测市场（{len(complete_markets)} 个有完整赔率）")
+            log(f"  ✅ 成功获取 {len(markets)} 个真实体育预测市场（{len(complete_markets)} 个有完整赔率）")
             return markets
         else:
-            print("  ❌ 未找到任何真实的体育预测市场")
-            print("  💡 可能原因: 当前时间段没有活跃的体育赛事预测市场")
+            log("  ❌ 未找到任何真实的体育预测市场")
+            log("  💡 可能原因: 当前时间段没有活跃的体育赛事预测市场")
             return []
 
     except Exception as e:
-        print(f"  ❌ 体育市场获取失败: {e}")
+        log(f"  ❌ 体育市场获取失败: {e}")
         return []
 
 
@@ -469,15 +544,25 @@ def demo_sports_api_usage():
     print("   - 找到感兴趣的联赛后，使用其series_id调用 fetch_sports_events()")
     print("   - tag_id=100639 用于过滤游戏投注，排除期货和长期预测")
 
-def fetch_crypto_markets(limit=3):
-    """专门获取加密货币市场数据"""
-    print("  🔍 获取加密货币市场...")
+def is_crypto_market(market):
+    """判断市场是否为加密货币价格类市场"""
+    question = market.get("question", "")
+
+    # 先检查较短的问题文本：包含加密货币关键词和价格类描述
+    if not CRYPTO_KEYWORDS_RE.search(question) or not CRYPTO_PRICE_RE.search(question):
+        return False
+
+    # 最后才扫描较长的描述文本，排除政治相关市场
+    return not (CRYPTO_EXCLUDE_RE.search(question) or CRYPTO_EXCLUDE_RE.search(market.get("description", "")))
+
+def fetch_crypto_markets(limit=3, log=print):
+    """专门获取加密货币市场数据，进度信息通过 log 输出"""
+    log("  🔍 获取加密货币市场...")
 
     crypto_markets = []
 
     try:
         # 策略1: 直接从markets API获取活跃市场，然后过滤加密货币相关的
-        markets_url = f"{GAMMA_BASE}/markets"
         params = {
             "active": "true",  # 获取活跃市场
             "closed": "false",
@@ -486,41 +571,23 @@ def fetch_crypto_markets(limit=3):
             "ascending": "false"
         }
 
-        r = requests.get(markets_url, headers=HEADERS, params=params, timeout=10)
-        r.raise_for_status()
-        all_markets = r.json()
+        all_markets = fetch_gamma_markets(params, timeout=10)
 
         # 过滤出加密货币相关的市场
-        crypto_keywords = ['bitcoin', 'btc', 'ethereum', 'eth', 'solana', 'xrp', 'chainlink', 'polygon', 'bnb', 'ada', 'doge', 'shib', 'matic', 'blockchain', 'defi', 'nft']
-
-        # 排除政治相关的关键词（因为政治市场有时会包含crypto相关的错误匹配）
-        exclude_keywords = ['biden', 'trump', 'election', 'president', 'political', 'government', 'democratic', 'republican', 'nevada', 'swing', 'candidate', 'nomination', 'press conference', 'coronavirus']
-
         for market in all_markets:
             if len(crypto_markets) >= limit:
                 break
 
-            question = market.get("question", "").lower()
-            description = market.get("description", "").lower()
+            if is_crypto_market(market):
+                # 避免重复
+                if not any(m.get("id") == market.get("id") for m in crypto_markets):
+                    crypto_markets.append(market)
 
-            # 检查问题是否包含加密货币关键词，且不包含政治关键词
-            has_crypto_keyword = any(keyword in question for keyword in crypto_keywords)
-            has_exclude_keyword = any(exclude in question or exclude in description for exclude in exclude_keywords)
-
-            if has_crypto_keyword and not has_exclude_keyword:
-                # 放宽过滤条件：只要包含加密货币关键词且不包含政治关键词即可
-                # 包括价格预测、达到目标价位等各种加密货币相关问题
-                price_indicators = ['price', 'hit', 'reach', 'above', 'below', '$', 'usd', 'market cap', 'fdv', 'valuation', 'up or down', 'trading', 'exchange']
-                if any(indicator in question for indicator in price_indicators) or 'will' in question:
-                    # 避免重复
-                    if not any(m.get("id") == market.get("id") for m in crypto_markets):
-                        crypto_markets.append(market)
-
-        print(f"  📊 从 {len(all_markets)} 个活跃市场中找到 {len(crypto_markets)} 个加密货币市场")
+        log(f"  📊 从 {len(all_markets)} 个活跃市场中找到 {len(crypto_markets)} 个加密货币市场")
 
         # 如果还是没有找到，尝试获取已结束的加密货币市场
         if len(crypto_markets) == 0:
-            print("  🔄 未找到活跃加密货币市场，尝试获取已结束市场...")
+            log("  🔄 未找到活跃加密货币市场，尝试获取已结束市场...")
 
             params_closed = {
                 "closed": "true",
@@ -529,45 +596,35 @@ def fetch_crypto_markets(limit=3):
                 "ascending": "false"
             }
 
-            r_closed = requests.get(markets_url, headers=HEADERS, params=params_closed, timeout=10)
-            r_closed.raise_for_status()
-            closed_markets = r_closed.json()
+            closed_markets = fetch_gamma_markets(params_closed, timeout=10)
 
             for market in closed_markets:
                 if len(crypto_markets) >= limit:
                     break
 
-                question = market.get("question", "").lower()
-                description = market.get("description", "").lower()
-
                 # 使用相同的过滤逻辑
-                has_crypto_keyword = any(keyword in question for keyword in crypto_keywords)
-                has_exclude_keyword = any(exclude in question or exclude in description for exclude in exclude_keywords)
-
-                if has_crypto_keyword and not has_exclude_keyword:
-                    price_indicators = ['price', 'hit', 'reach', 'above', 'below', '$', 'usd', 'market cap', 'fdv', 'valuation', 'up or down', 'trading', 'exchange']
-                    if any(indicator in question for indicator in price_indicators) or 'will' in question:
-                        if not any(m.get("id") == market.get("id") for m in crypto_markets):
-                            crypto_markets.append(market)
+                if is_crypto_market(market):
+                    if not any(m.get("id") == market.get("id") for m in crypto_markets):
+                        crypto_markets.append(market)
 
-            print(f"  📊 从已结束市场中找到 {len(crypto_markets)} 个加密货币市场")
+            log(f"  📊 从已结束市场中找到 {len(crypto_markets)} 个加密货币市场")
 
     except Exception as e:
-        print(f"  ❌ 获取加密货币市场失败: {e}")
+        log(f"  ❌ 获取加密货币市场失败: {e}")
 
-    print(f"  ✅ 最终获取到 {len(crypto_markets)} 个加密货币市场")
+    log(f"  ✅ 最终获取到 {len(crypto_markets)} 个加密货币市场")
     return crypto_markets[:limit]
 
-def fetch_markets_by_category(category, limit=3):
-    """按分类抓取活跃市场，限制条数"""
+def fetch_markets_by_category(category, limit=3, log=print):
+    """按分类抓取活跃市场，限制条数；进度信息通过 log 输出（默认直接打印）"""
 
     # 加密货币分类使用专门的系列API
     if category == "Crypto":
-        return fetch_crypto_markets(limit)
+        return fetch_crypto_markets(limit, log=log)
 
     # 体育分类使用专门的体育API
     if category == "Sports":
-        return fetch_sports_markets(limit)
+        return fetch_sports_markets(limit, log=log)
 
     # 其他分类使用通用市场API - 优先获取已结束的市场（有完整赔率数据）
     url = f"{GAMMA_BASE}/markets"
@@ -581,9 +638,7 @@ def fetch_markets_by_category(category, limit=3):
     }
 
     try:
-        r = requests.get(url, headers=HEADERS, params=params, timeout=10)
-        r.raise_for_status()
-        all_markets = r.json()
+        all_markets = fetch_gamma_markets(params, timeout=10)
 
         # 过滤2025年11月之后的数据（包含2026年的市场）
         cutoff_date = "2025-11-01T00:00:00Z"
@@ -593,7 +648,7 @@ def fetch_markets_by_category(category, limit=3):
             if created_at >= cutoff_date:
                 recent_markets.append(market)
 
-        print(f"  📅 从 {len(all_markets)} 个市场中过滤出 {len(recent_markets)} 个2025年9月之后的市场")
+        log(f"  📅 从 {len(all_markets)} 个市场中过滤出 {len(recent_markets)} 个2025年9月之后的市场")
 
         # 本地按内容过滤分类
         filtered_markets = []
@@ -613,7 +668,7 @@ def fetch_markets_by_category(category, limit=3):
 
         # 如果已结束的市场中找不到足够的数据，回退到获取活跃市场
         if len(filtered_markets) < limit:
-            print(f"  📈 已结束市场中只找到 {len(filtered_markets)} 个{category}市场，尝试获取活跃市场补充...")
+            log(f"  📈 已结束市场中只找到 {len(filtered_markets)} 个{category}市场，尝试获取活跃市场补充...")
             try:
                 active_params = {
                     "active": "true",
@@ -622,9 +677,7 @@ def fetch_markets_by_category(category, limit=3):
                     "order": "volumeNum",
                     "ascending": "false"
                 }
-                active_r = requests.get(url, headers=HEADERS, params=active_params, timeout=10)
-                active_r.raise_for_status()
-                active_markets = active_r.json()
+                active_markets = fetch_gamma_markets(active_params, timeout=10)
 
                 # 从活跃市场中补充数据
                 for market in active_markets:
@@ -637,28 +690,28 @@ def fetch_markets_by_category(category, limit=3):
                             filtered_markets.append(market)
 
             except requests.exceptions.RequestException as e:
-                print(f"  ⚠️ 获取活跃市场补充数据失败: {e}")
+                log(f"  ⚠️ 获取活跃市场补充数据失败: {e}")
 
         return filtered_markets[:limit]
 
     except requests.exceptions.RequestException as e:
-        print(f"❌ 抓取分类 {category} 市场失败: {e}")
+        log(f"❌ 抓取分类 {category} 市场失败: {e}")
         return []
     try:
-        r = requests.get(url, headers=HEADERS, params=params, timeout=10)
+        r = SESSION.get(url, headers=HEADERS, params=params, timeout=10)
         r.raise_for_status()
-        return r.json()
+        return parse_json_response(r)
     except requests.exceptions.RequestException as e:
-        print(f"❌ 抓取分类 {category} 市场失败: {e}")
+        log(f"❌ 抓取分类 {category} 市场失败: {e}")
         return []
 
 def fetch_market_orderbook(market_id):
     """尝试抓取市场 orderbook"""
     url = f"{CLOB_BASE}/markets/{market_id}/orderbook"
     try:
-        r = requests.get(url, headers=HEADERS, timeout=5)
+        r = SESSION.get(url, headers=HEADERS, timeout=5)
         if r.status_code == 200:
-            return r.json()
+            return parse_json_response(r)
     except requests.exceptions.RequestException:
         pass
     return None
@@ -671,7 +724,7 @@ def parse_outcome_prices(price_data):
         return price_data
     if isinstance(price_data, str):
         try:
-            prices = json.loads(price_data)
+            prices = orjson.loads(price_data)
             if isinstance(prices, list):
                 return prices
         except json.JSONDecodeError:
@@ -703,43 +756,44 @@ def infer_category(question):
 
     return "Other"
 
+@functools.lru_cache(maxsize=512)
+def _lookup_clob_token_ids(condition_id):
+    """查找condition ID对应的CLOb Token IDs（进程内缓存；请求失败时抛出异常，不缓存）"""
+    params = {
+        "closed": "true",
+        "limit": 100,
+        "order": "createdAt",
+        "ascending": "false"
+    }
+
+    data = fetch_gamma_markets(params, timeout=5, headers=None)
+    if isinstance(data, list):
+        # 查找匹配的condition ID
+        for market in data:
+            if market.get('conditionId') == condition_id:
+                # 获取CLOb Token IDs
+                clob_tokens = market.get('clobTokenIds')
+                if clob_tokens:
+                    if isinstance(clob_tokens, str):
+                        try:
+                            import ast
+                            clob_tokens = ast.literal_eval(clob_tokens)
+                        except:
+                            clob_tokens = clob_tokens
+                    if isinstance(clob_tokens, list):
+                        return tuple(clob_tokens)
+                break
+    return None
+
 def get_contracts_by_condition_id(condition_id):
     """基于condition ID获取对应的合约地址"""
-    contracts = {
-        "conditional_tokens": "0x4D97DCd97eC945f40cF65F87097ACe5EA0476045",
-        "clob_exchange": "0x4bfb41d5b3570defd03c39a9a4d8de6bd8b8982e",
-        "fee_module": "0xE3f18aCc55091e2c48d883fc8C8413319d4Ab7b0"
-    }
+    contracts = dict(POLYMARKET_CONTRACTS)
 
     # 尝试通过API获取最新的市场信息
     try:
-        markets_url = "https://gamma-api.polymarket.com/markets"
-        params = {
-            "closed": "true",
-            "limit": 100,
-            "order": "createdAt",
-            "ascending": "false"
-        }
-
-        response = requests.get(markets_url, params=params, timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            if isinstance(data, list):
-                # 查找匹配的condition ID
-                for market in data:
-                    if market.get('conditionId') == condition_id:
-                        # 获取CLOb Token IDs
-                        clob_tokens = market.get('clobTokenIds')
-                        if clob_tokens:
-                            if isinstance(clob_tokens, str):
-                                try:
-                                    import ast
-                                    clob_tokens = ast.literal_eval(clob_tokens)
-                                except:
-                                    clob_tokens = clob_tokens
-                            if isinstance(clob_tokens, list):
-                                contracts["clob_token_ids"] = clob_tokens
-                        break
+        clob_tokens = _lookup_clob_token_ids(condition_id)
+        if clob_tokens is not None:
+            contracts["clob_token_ids"] = list(clob_tokens)
     except:
         pass
 
@@ -771,19 +825,13 @@ def get_contract_addresses(market):
         try:
             # 解析JSON字符串
             if isinstance(clob_tokens, str):
-                clob_tokens = json.loads(clob_tokens)
+                clob_tokens = orjson.loads(clob_tokens)
             contract_info["clob_token_ids"] = clob_tokens
         except:
             contract_info["clob_token_ids"] = clob_tokens
 
-    # Polymarket真实合约地址（来自官方文档和区块链验证）
-    polymarket_contracts = {
-        "conditional_tokens": "0x4D97DCd97eC945f40cF65F87097ACe5EA0476045",  # Conditional Tokens主合约
-        "clob_exchange": "0x4bfb41d5b3570defd03c39a9a4d8de6bd8b8982e",     # CLOb Exchange合约
-        "fee_module": "0xE3f18aCc55091e2c48d883fc8C8413319d4Ab7b0"        # Fee Module合约
-    }
-
-    contract_info["known_contracts"] = polymarket_contracts
+    # Polymarket真实合约地址（模块级常量，不随每个市场重建）
+    contract_info["known_contracts"] = POLYMARKET_CONTRACTS
 
     return contract_info
 
@@ -821,6 +869,16 @@ def explain_etherscan_lookup(market):
     print("   - 交易可能通过多个合约完成")
     print("   - 高频交易市场可能有大量交易记录")
 
+# Python 3.11+ 的 fromisoformat 可直接解析结尾的 'Z'，无需先替换成 '+00:00'
+_FROMISO_HANDLES_Z = sys.version_info >= (3, 11)
+
+
+def parse_iso_datetime(value):
+    """解析ISO 8601时间字符串（支持结尾的 'Z'）"""
+    if _FROMISO_HANDLES_Z or not value.endswith('Z'):
+        return datetime.fromisoformat(value)
+    return datetime.fromisoformat(value[:-1] + '+00:00')
+
 def get_game_status(market):
     """分析比赛状态"""
     question = market.get("question", "").lower()
@@ -840,11 +898,7 @@ def get_game_status(market):
     # 解析结束时间
     try:
         if end_date_str and end_date_str != "N/A":
-            # 处理不同的时间格式
-            if end_date_str.endswith('Z'):
-                end_date = datetime.fromisoformat(end_date_str.replace('Z', '+00:00'))
-            else:
-                end_date = datetime.fromisoformat(end_date_str)
+            end_date = parse_iso_datetime(end_date_str)
 
             now = datetime.now(timezone.utc)
             time_diff = end_date - now
@@ -910,58 +964,60 @@ def display_market_info(market):
     # 解析outcomes JSON字符串
     outcomes_raw = market.get("outcomes", "[]")
     try:
-        outcomes = json.loads(outcomes_raw) if isinstance(outcomes_raw, str) else outcomes_raw
+        outcomes = orjson.loads(outcomes_raw) if isinstance(outcomes_raw, str) else outcomes_raw
     except json.JSONDecodeError:
         outcomes = []
 
     outcome_prices = parse_outcome_prices(market.get("outcomePrices"))
 
-    print("──────────────────────────────")
-    print(f"Market ID : {market_id}")
-    print(f"Question  : {question}")
-    print(f"Category  : {category}")
+    # 先收集所有输出行，最后一次性写出
+    lines = []
+    lines.append("──────────────────────────────")
+    lines.append(f"Market ID : {market_id}")
+    lines.append(f"Question  : {question}")
+    lines.append(f"Category  : {category}")
 
     # 显示比赛状态（如果是体育赛事）
     if game_status:
-        print(f"Status    : {game_status}")
+        lines.append(f"Status    : {game_status}")
     else:
-        print(f"End Date  : {end_date}")
+        lines.append(f"End Date  : {end_date}")
 
-    print(f"Volume    : {volume}")
-    print(f"Liquidity : {liquidity}")
+    lines.append(f"Volume    : {volume}")
+    lines.append(f"Liquidity : {liquidity}")
 
     # 显示合约相关信息
     condition_id = market.get("conditionId", "N/A")
     clob_token_ids = market.get("clobTokenIds", "N/A")
 
     if condition_id != "N/A":
-        print(f"Condition ID: {condition_id}")
+        lines.append(f"Condition ID: {condition_id}")
     if clob_token_ids != "N/A":
-        print(f"CLOb Tokens : {clob_token_ids}")
+        lines.append(f"CLOb Tokens : {clob_token_ids}")
 
     # 如果用户想要详细的合约信息，提供说明
     if condition_id != "N/A" or clob_token_ids != "N/A":
-        print("💡 使用 explain_etherscan_lookup(market) 查看Etherscan查询指南")
+        lines.append("💡 使用 explain_etherscan_lookup(market) 查看Etherscan查询指南")
 
     # 显示 outcomes
     if outcomes:
-        print("Outcomes & Prices:")
+        lines.append("Outcomes & Prices:")
         for i, o in enumerate(outcomes):
             try:
                 p = float(outcome_prices[i])
-                print(f"  - {o}: {p:.4f} ({p*100:.1f}%)")
+                lines.append(f"  - {o}: {p:.4f} ({p*100:.1f}%)")
             except (IndexError, ValueError):
-                print(f"  - {o}: 暂无价格")
+                lines.append(f"  - {o}: 暂无价格")
     else:
         # 检查数据来源，如果是体育API，显示特殊提示
         if market.get("data_source") == "sports_api":
-            print("Outcomes: 体育API暂不支持赔率数据")
+            lines.append("Outcomes: 体育API暂不支持赔率数据")
         else:
-            print("Outcomes: 暂无")
+            lines.append("Outcomes: 暂无")
 
     # orderbook
     orderbook = fetch_market_orderbook(market_id)
-    print("\n📊 Orderbook:")
+    lines.append("\n📊 Orderbook:")
     if orderbook and "bids" in orderbook and "asks" in orderbook:
         bids = orderbook.get("bids", [])
         asks = orderbook.get("asks", [])
@@ -969,13 +1025,15 @@ def display_market_info(market):
             best_bid = float(bids[0][0]) if bids[0] else 0
             best_ask = float(asks[0][0]) if asks[0] else 0
             mid_price = (best_bid + best_ask)/2 if best_bid>0 and best_ask>0 else 0
-            print(f"  Best Bid: {best_bid}")
-            print(f"  Best Ask: {best_ask}")
-            print(f"  Mid Price: {mid_price}")
+            lines.append(f"  Best Bid: {best_bid}")
+            lines.append(f"  Best Ask: {best_ask}")
+            lines.append(f"  Mid Price: {mid_price}")
         else:
-            print("  ❌ No active bids/asks")
+            lines.append("  ❌ No active bids/asks")
     else:
-        print("  ❌ Orderbook 不可用")
+        lines.append("  ❌ Orderbook 不可用")
+
+    sys.stdout.write("\n".join(lines) + "\n")
 
 def save_markets_to_file(all_markets, filename=None):
     """保存市场数据到 JSON 文件"""
@@ -998,8 +1056,8 @@ def save_markets_to_file(all_markets, filename=None):
     }
 
     try:
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(data_to_save, f, indent=2, ensure_ascii=False)
+        with open(filepath, "wb") as f:
+            f.write(orjson.dumps(data_to_save, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
         print(f"💾 数据已保存到 {filepath}")
         return filepath
     except Exception as e:
@@ -1015,9 +1073,24 @@ def main():
     all_markets = []
     category_results = {}  # 存储各分类的结果
 
+    # 各分类的抓取互不依赖，并发发起网络请求；抓取过程的日志先收集起来，
+    # 再按分类顺序连同结果一起打印，避免多线程输出交错
+    fetch_logs = {category: [] for category in TARGET_CATEGORIES}
+    with ThreadPoolExecutor(max_workers=len(TARGET_CATEGORIES)) as executor:
+        futures = {
+            category: executor.submit(fetch_markets_by_category, category,
+                                      limit=MARKET_PER_CATEGORY, log=fetch_logs[category].append)
+            for category in TARGET_CATEGORIES
+        }
+
     for category in TARGET_CATEGORIES:
-        print(f"\n🔹 抓取分类: {category}")
-        markets = fetch_markets_by_category(category, limit=MARKET_PER_CATEGORY)
+        print(f"\n🔹 分类: {category}")
+        try:
+            markets = futures[category].result()
+        finally:
+            # 抓取抛出异常时也先输出已收集的日志
+            for line in fetch_logs[category]:
+                print(line)
         category_results[category] = markets
 
         if markets:
@@ -1049,11 +1122,12 @@ def main():
         market_id = market.get('id')
         if market_id and market_id not in seen_ids:
             seen_ids.add(market_id)
-            # 为每个市场添加合约地址信息
-            contract_info = get_contract_addresses(market)
-            if contract_info:
-                # 将合约地址信息合并到市场数据中
-                market.update(contract_info)
+            # 为每个市场添加合约地址信息（抓取分类时已添加过的不再重复计算）
+            if "known_contracts" not in market:
+                contract_info = get_contract_addresses(market)
+                if contract_info:
+                    # 将合约地址信息合并到市场数据中
+                    market.update(contract_info)
             unique_markets.append(market)
 
     if not all_markets: